@@ -1,9 +1,11 @@
-import json
+import ijson
 import pandas as pd
+import pyarrow as pa
 import numpy as np
 from datetime import datetime
 from collections import defaultdict
 import os
+import gc
 
 
 # STEP 1: LOAD AND FILTER JSON DATA
@@ -12,10 +14,38 @@ print("SPOTIFY 2025 ANALYTICS - ETL PIPELINE")
 
 json_file = 'Streaming_History_Audio_2024-2025_1.json'  
 
+# Keep relevant columns only - other fields are dropped while parsing.
+# Repeated strings are dictionary-encoded so they load straight as categories,
+# letting dedup and groupbys hash int codes
+category = pa.dictionary(pa.int32(), pa.string())
+schema = pa.schema([
+    ('ts', pa.string()),
+    ('master_metadata_track_name', category),
+    ('master_metadata_album_artist_name', category),
+    ('master_metadata_album_album_name', category),
+    ('ms_played', pa.int64()),
+    ('skipped', pa.bool_()),
+    ('shuffle', pa.bool_()),
+    ('offline', pa.bool_()),
+    ('incognito_mode', pa.bool_()),
+    ('platform', category),
+    ('conn_country', category),
+    ('reason_end', category)
+])
+cols_to_keep = schema.names
+
+# Stream records one at a time and keep only 2025 plays, so earlier years
+# are never held in memory. Kept values go straight into per-column lists.
+total_records = 0
+data_2025 = {col: [] for col in cols_to_keep}
 try:
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    print(f"✓ Loaded JSON file: {len(data)} total records")
+    with open(json_file, 'rb') as f:
+        for record in ijson.items(f, 'item'):
+            total_records += 1
+            if (record.get('ts') or '')[:4] == '2025':
+                for col in cols_to_keep:
+                    data_2025[col].append(record.get(col))
+    print(f"✓ Loaded JSON file: {total_records} total records")
 except FileNotFoundError:
     print(f"✗ Error: File '{json_file}' not found!")
     exit()
@@ -23,66 +53,56 @@ except FileNotFoundError:
 
 # STEP 2: FILTER FOR 2025 DATA ONLY
 
-data_2025 = []
-for record in data:
-    if record.get('ts'):
-        ts = record['ts']
-        year = int(ts[:4])
-        if year == 2025:
-            data_2025.append(record)
-
-print(f"✓ Filtered for 2025: {len(data_2025)} records")
+print(f"✓ Filtered for 2025: {len(data_2025['ts'])} records")
 
 
 # STEP 3: CREATE BASE DATAFRAME
 
 
-df = pd.DataFrame(data_2025)
-
-# Keep relevant columns only
-cols_to_keep = [
-    'ts', 'master_metadata_track_name', 'master_metadata_album_artist_name',
-    'master_metadata_album_album_name', 'ms_played', 'skipped', 'shuffle',
-    'offline', 'incognito_mode', 'platform', 'conn_country', 'reason_end'
-]
+table = pa.Table.from_pydict(data_2025, schema=schema)
+df = table.to_pandas(types_mapper=lambda t: None if pa.types.is_dictionary(t) else pd.ArrowDtype(t))
 
-df = df[cols_to_keep].copy()
+# Free the parsed Python lists before feature engineering allocates columns
+del data_2025, table
+gc.collect()
 print(f"✓ Created base dataframe with {len(df)} records")
 
 # STEP 4: DATA CLEANING
 
 
 # Handle missing track/artist names (skip entries without them)
-df = df[df['master_metadata_track_name'].notna()].copy()
-df = df[df['master_metadata_album_artist_name'].notna()].copy()
+mask = df['master_metadata_track_name'].notna() & df['master_metadata_album_artist_name'].notna()
+df = df.loc[mask]
 print(f"✓ After removing null tracks/artists: {len(df)} records")
 
 # Remove duplicates (exact same record)
-df = df.drop_duplicates()
+df = df.drop_duplicates().reset_index(drop=True)
 print(f"✓ After removing duplicates: {len(df)} records")
 
 
 # STEP 5: FEATURE ENGINEERING
 
 
-# Parse timestamp
-df['datetime'] = pd.to_datetime(df['ts'])
-df['date'] = df['datetime'].dt.date
-df['hour'] = df['datetime'].dt.hour
-df['day_of_week'] = df['datetime'].dt.day_name()
-df['day_of_week_num'] = df['datetime'].dt.dayofweek
-df['week_number'] = df['datetime'].dt.isocalendar().week
-df['month'] = df['datetime'].dt.month
-df['month_name'] = df['datetime'].dt.strftime('%B')
-df['day_name'] = df['datetime'].dt.strftime('%A')
+# Parse timestamp (fixed ISO-8601 format, duplicate strings parsed once)
+df['datetime'] = pd.to_datetime(df['ts'], format='%Y-%m-%dT%H:%M:%SZ', cache=True, utc=True)
+
+# Derive calendar fields from the raw epoch seconds in one pass (all UTC)
+secs = df['datetime'].values.astype('datetime64[s]').view('i8')
+days = secs // 86400
+df['date'] = days.astype('datetime64[D]')
+df['hour'] = (secs // 3600) % 24
+df['day_of_week_num'] = (days + 3) % 7  # 1970-01-01 was a Thursday (Monday = 0)
+thursday = days - df['day_of_week_num'].values + 3  # ISO weeks belong to the year of their Thursday
+iso_year_start = thursday.astype('datetime64[D]').astype('datetime64[Y]').astype('datetime64[D]').view('i8')
+df['week_number'] = (thursday - iso_year_start) // 7 + 1
+df['month'] = secs.astype('datetime64[s]').astype('datetime64[M]').view('i8') % 12 + 1
+day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+dow_dtype = pd.CategoricalDtype(day_order, ordered=True)
+df['day_name'] = pd.Categorical.from_codes(df['day_of_week_num'], dtype=dow_dtype)
 
 # Convert milliseconds to minutes
 df['minutes_played'] = df['ms_played'] / 60000
 
-# Listening completion (if not skipped, assume completed)
-df['was_completed'] = (~df['skipped']).astype(int)
-df['was_skipped'] = df['skipped'].astype(int)
-
 # Rename columns for clarity
 df = df.rename(columns={
     'master_metadata_track_name': 'track_name',
@@ -104,10 +124,14 @@ print("=" * 80)
 daily_summary = df.groupby('date').agg(
     total_minutes=('minutes_played', 'sum'),
     tracks_played=('track_name', 'count'),
-    skips=('was_skipped', 'sum'),
-    completions=('was_completed', 'sum'),
-    unique_artists=('artist_name', 'nunique')
-).reset_index()
+    skips=('skipped', 'sum')
+)
+# Listening completion (if not skipped, assume completed)
+daily_summary['completions'] = daily_summary['tracks_played'] - daily_summary['skips']
+# Distinct counts via dedup + size avoid building a set per group
+daily_artists = df[['date', 'artist_name']].drop_duplicates()
+daily_summary['unique_artists'] = daily_artists.groupby('date').size()
+daily_summary = daily_summary.reset_index()
 
 daily_summary['skip_rate'] = (daily_summary['skips'] / daily_summary['tracks_played'] * 100).round(2)
 daily_summary['hours_played'] = (daily_summary['total_minutes'] / 60).round(2)
@@ -115,14 +139,18 @@ daily_summary = daily_summary.sort_values('date')
 print(f"✓ Daily Summary: {len(daily_summary)} days")
 
 # TABLE 2: ARTIST SUMMARY
-artist_summary = df.groupby('artist_name').agg(
+artist_summary = df.groupby('artist_name', observed=True).agg(
     total_minutes=('minutes_played', 'sum'),
-    track_count=('track_name', 'nunique'),
     plays=('track_name', 'count'),
-    skips=('was_skipped', 'sum'),
+    skips=('skipped', 'sum'),
     first_play=('date', 'min'),
     last_play=('date', 'max')
-).reset_index()
+)
+# Group by (track, artist) once: each group is one distinct track of an
+# artist here, and the same groups are aggregated for the track summary
+track_groups = df.groupby(['track_name', 'artist_name'], observed=True)
+artist_summary.insert(1, 'track_count', track_groups.size().groupby(level='artist_name', observed=True).size())
+artist_summary = artist_summary.reset_index()
 
 artist_summary['skip_rate'] = (artist_summary['skips'] / artist_summary['plays'] * 100).round(2)
 artist_summary['hours_played'] = (artist_summary['total_minutes'] / 60).round(2)
@@ -130,65 +158,73 @@ artist_summary = artist_summary.sort_values('total_minutes', ascending=False)
 print(f"✓ Artist Summary: {len(artist_summary)} unique artists")
 
 # TABLE 3: TRACK SUMMARY
-track_summary = df.groupby(['track_name', 'artist_name']).agg(
+track_summary = track_groups.agg(
     total_minutes=('minutes_played', 'sum'),
     play_count=('track_name', 'count'),
-    skips=('was_skipped', 'sum'),
-    completions=('was_completed', 'sum'),
+    skips=('skipped', 'sum'),
     first_play=('date', 'min'),
     last_play=('date', 'max')
-).reset_index()
+)
+track_summary.insert(3, 'completions', track_summary['play_count'] - track_summary['skips'])
+track_summary = track_summary.reset_index()
 
 track_summary['skip_rate'] = (track_summary['skips'] / track_summary['play_count'] * 100).round(2)
 track_summary = track_summary.sort_values('total_minutes', ascending=False)
 print(f"✓ Track Summary: {len(track_summary)} unique tracks")
 
 # TABLE 4: HOURLY PATTERN
-hourly_pattern = df.groupby('hour').agg(
+# Scan once by hour x weekday; the hourly and weekly totals are marginals of it
+hour_dow_cube = df.groupby(['hour', 'day_of_week_num']).agg(
     total_minutes=('minutes_played', 'sum'),
     track_count=('track_name', 'count'),
-    skips=('was_skipped', 'sum'),
-    unique_artists=('artist_name', 'nunique')
-).reset_index()
+    skips=('skipped', 'sum')
+)
+
+hourly_pattern = hour_dow_cube.groupby(level='hour').sum()
+hourly_pattern['unique_artists'] = df[['hour', 'artist_name']].drop_duplicates().groupby('hour').size()
+hourly_pattern = hourly_pattern.reset_index()
 
 hourly_pattern['avg_minutes_per_session'] = (hourly_pattern['total_minutes'] / hourly_pattern['track_count']).round(2)
 hourly_pattern['skip_rate'] = (hourly_pattern['skips'] / hourly_pattern['track_count'] * 100).round(2)
 print(f"✓ Hourly Pattern: {len(hourly_pattern)} hours")
 
 # TABLE 5: DAY OF WEEK PATTERN
-day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-weekly_pattern = df.groupby('day_name').agg(
-    total_minutes=('minutes_played', 'sum'),
-    track_count=('track_name', 'count'),
-    skips=('was_skipped', 'sum'),
-    unique_artists=('artist_name', 'nunique')
-).reset_index()
+weekly_pattern = hour_dow_cube.groupby(level='day_of_week_num').sum()
+weekly_pattern['unique_artists'] = df[['day_of_week_num', 'artist_name']].drop_duplicates().groupby('day_of_week_num').size()
+weekly_pattern = weekly_pattern.reset_index()
+weekly_pattern.insert(0, 'day_name', pd.Categorical.from_codes(weekly_pattern['day_of_week_num'], dtype=dow_dtype))
 
 weekly_pattern['skip_rate'] = (weekly_pattern['skips'] / weekly_pattern['track_count'] * 100).round(2)
-weekly_pattern['day_order'] = weekly_pattern['day_name'].map(lambda x: day_order.index(x))
-weekly_pattern = weekly_pattern.sort_values('day_order')
+weekly_pattern['day_order'] = weekly_pattern.pop('day_of_week_num')
+weekly_pattern = weekly_pattern.sort_values('day_name')
 print(f"✓ Weekly Pattern: {len(weekly_pattern)} days")
 
 # TABLE 6: MONTHLY PROGRESSION
-monthly_progression = df.groupby('month').agg(
-    total_minutes=('minutes_played', 'sum'),
-    tracks_played=('track_name', 'count'),
-    skips=('was_skipped', 'sum'),
-    unique_artists=('artist_name', 'nunique'),
-    unique_tracks=('track_name', 'nunique'),
-    days_with_listening=('date', 'nunique')
-).reset_index()
+# Additive metrics roll up from the daily table instead of rescanning df
+monthly_totals = daily_summary.groupby(daily_summary['date'].dt.month.rename('month')).agg(
+    total_minutes=('total_minutes', 'sum'),
+    tracks_played=('tracks_played', 'sum'),
+    skips=('skips', 'sum'),
+    days_with_listening=('date', 'count')
+)
+monthly_artists = daily_artists.assign(month=daily_artists['date'].dt.month).drop_duplicates(['month', 'artist_name'])
+monthly_totals['unique_artists'] = monthly_artists.groupby('month').size()
+monthly_totals['unique_tracks'] = df[['month', 'track_name']].drop_duplicates().groupby('month').size()
+monthly_progression = monthly_totals[[
+    'total_minutes', 'tracks_played', 'skips', 'unique_artists', 'unique_tracks', 'days_with_listening'
+]].reset_index()
 
 monthly_progression['hours_played'] = (monthly_progression['total_minutes'] / 60).round(2)
 monthly_progression['skip_rate'] = (monthly_progression['skips'] / monthly_progression['tracks_played'] * 100).round(2)
-monthly_progression['month_name'] = monthly_progression['month'].map({
-    1: 'January', 2: 'February', 3: 'March', 4: 'April', 5: 'May', 6: 'June',
-    7: 'July', 8: 'August', 9: 'September', 10: 'October', 11: 'November', 12: 'December'
-})
+month_names = np.array([
+    '', 'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+])
+monthly_progression['month_name'] = month_names[monthly_progression['month'].to_numpy()]
 print(f"✓ Monthly Progression: {len(monthly_progression)} months")
 
 # TABLE 7: PLATFORM DISTRIBUTION
-platform_dist = df.groupby('platform').agg(
+platform_dist = df.groupby('platform', observed=True).agg(
     total_minutes=('minutes_played', 'sum'),
     track_count=('track_name', 'count')
 ).reset_index()
@@ -205,14 +241,16 @@ print("\n" + "=" * 80)
 print("KEY PERFORMANCE INDICATORS (2025)")
 print("=" * 80)
 
-total_minutes = df['minutes_played'].sum()
+# Read totals off the aggregated tables rather than rescanning df
+total_minutes = daily_summary['total_minutes'].sum()
 total_hours = total_minutes / 60
-total_tracks = len(df)
-unique_artists = df['artist_name'].nunique()
-unique_tracks = df['track_name'].nunique()
-skip_rate = (df['was_skipped'].sum() / len(df) * 100)
-completion_rate = (df['was_completed'].sum() / len(df) * 100)
-listening_days = df['date'].nunique()
+total_tracks = daily_summary['tracks_played'].sum()
+unique_artists = len(artist_summary)
+unique_tracks = track_summary['track_name'].nunique()
+total_skips = daily_summary['skips'].sum()
+skip_rate = (total_skips / total_tracks * 100)
+completion_rate = (daily_summary['completions'].sum() / total_tracks * 100)
+listening_days = len(daily_summary)
 avg_daily_minutes = total_minutes / listening_days
 
 print(f"Total Listening Time: {total_hours:,.1f} hours ({total_minutes:,.0f} minutes)")
@@ -236,6 +274,14 @@ output_dir = 'spotify_analytics_output'
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
 
+# The dashboard's raw_data_2025 import expects the original calendar and
+# completion columns; the aggregations don't need them, so they are only
+# added for export
+df.insert(df.columns.get_loc('day_of_week_num'), 'day_of_week', df['day_name'])
+df.insert(df.columns.get_loc('day_name'), 'month_name', pd.Categorical.from_codes(df['month'] - 1, categories=month_names[1:]))
+df['was_completed'] = (~df['skipped']).astype('int8')
+df['was_skipped'] = df['skipped'].astype('int8')
+
 # Export all tables
 tables = {
     'daily_summary.csv': daily_summary,